@@ -4,6 +4,7 @@ import os
 import zipfile
 import tempfile
 import shutil
+import numpy as np
 from tqdm import tqdm
 from pathlib import Path
 from urllib.request import urlopen
@@ -29,6 +30,45 @@ def test_ops(tmpdir, data_dir):
     """Initializes ops to be used for tests. Also, uses tmpdir fixture to create a unique temporary dir for each test."""
     return initialize_ops(tmpdir, data_dir)
 
+
+@pytest.fixture()
+def synthetic_movie():
+    """Returns a function making int16 movies of Gaussian cells with sparse activity, to run the pipeline without the test data."""
+    def make_movie(seed=0, nframes=600, Ly=64, Lx=72, ncells=12):
+        rs = np.random.RandomState(seed)
+        yy, xx = np.mgrid[:Ly, :Lx]
+        centers = rs.randint(8, min(Ly, Lx) - 8, (ncells, 2))
+        cells = np.array([np.exp(-((yy - cy)**2 + (xx - cx)**2) / 8.) for cy, cx in centers])
+        act = rs.rand(ncells, nframes)**8 * 5
+        mov = 200 + 100 * np.einsum("ct,cyx->tyx", act, cells) + 300 * cells.sum(0) + 20 * rs.randn(nframes, Ly, Lx)
+        return mov.astype(np.int16)
+    return make_movie
+
+
+@pytest.fixture()
+def synthetic_ops():
+    """Returns a function making the ops to run the pipeline on a synthetic movie, saving to save_path."""
+    def make_ops(mov, save_path, **kwargs):
+        ops = suite2p.default_ops()
+        ops.update(
+            {
+                'save_path': str(save_path),
+                'ops_path': str(Path(save_path).joinpath('ops.npy')),
+                'nframes': mov.shape[0],
+                'Ly': mov.shape[1],
+                'Lx': mov.shape[2],
+                'yrange': [0, mov.shape[1]],
+                'xrange': [0, mov.shape[2]],
+                'use_builtin_classifier': True,
+                'norm_frames': False,
+                'denoise': False,
+                'soma_crop': False
+            }
+        )
+        ops.update(kwargs)
+        return ops
+    return make_ops
+
 def download_cached_inputs(data_path):
     """ Downloads test_input data if not present on machine. This function was created so it can also be used by scripts/generate_test_data.py."""
     cached_inputs = data_path.joinpath('test_inputs')
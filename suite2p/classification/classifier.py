@@ -12,8 +12,8 @@ class Classifier:
     Parameters
     ----------
 
-    classfile: string (optional, default None)
-        path to saved classifier
+    classfile: string or dict (optional, default None)
+        path to saved classifier, or saved classifier already loaded
 
     keys: list of str (optional, default None)
         keys of ROI stat to use to classify
@@ -36,15 +36,19 @@ class Classifier:
         Parameters
         ----------
         
-        classfile: string 
-            path to saved classifier
+        classfile: string or dict
+            path to saved classifier, or saved classifier already loaded
 
         keys: list of str (optional, default None)
             keys of ROI stat to use to classify
          
         """
         try:
-            model = np.load(classfile, allow_pickle=True).item()
+            if isinstance(classfile, dict):
+                # copy to leave the loaded classifier untouched
+                model = dict(classfile)
+            else:
+                model = np.load(classfile, allow_pickle=True).item()
             if keys is None:
                 self.keys = model["keys"]
                 self.stats = model["stats"]
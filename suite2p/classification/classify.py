@@ -11,9 +11,29 @@ builtin_classfile = Path(__file__).joinpath(
 user_classfile = Path.home().joinpath(".suite2p/classifiers/classifier_user.npy")
 
 
+def load_classifier(classfile: Union[str, Path]) -> dict:
+    """
+    Loads a saved classifier file, so that it can be passed to classify instead of its path
+
+    Parameters
+    ----------------
+
+    classfile: string
+        path to saved classifier
+
+    Returns
+    ----------------
+
+    model : dict
+        saved classifier with "keys", "stats" and "iscell"
+
+    """
+    return np.load(classfile, allow_pickle=True).item()
+
+
 def classify(
         stat: np.ndarray,
-        classfile: Union[str, Path],
+        classfile: Union[str, Path, dict],
         keys: Sequence[str] = ("npix_norm", "compact", "skew"),
 ):
     """ 
@@ -27,8 +47,8 @@ def classify(
     stat: dictionary "ypix", "xpix", "lam"
         Dictionary containing statistics for ROIs
 
-    classfile: string (optional, default None)
-        path to saved classifier
+    classfile: string or dict
+        path to saved classifier, or classifier already loaded with load_classifier
 
     keys: list of str (optional, default None)
         keys of ROI stat to use to classify
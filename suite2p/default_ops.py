@@ -2,6 +2,9 @@
 Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer and Marius Pachitariu.
 """
 
+from copy import copy
+from types import MappingProxyType
+
 from .version import __version__ as version
 
 
@@ -37,10 +40,14 @@ def default_ops():
         "frames_include": -1,
         "multiplane_parallel": False,  # whether or not to run on server
         "ignore_flyback": [],
+        "use_gpu": False,  # whether to run the registration phase-correlation on the GPU (if available)
+        "jobs_per_gpu": 1,  # number of planes processed at the same time on each GPU (if nplanes_parallel is 0)
+        "nplanes_parallel": 1,  # number of planes processed in parallel processes when running locally (0: as many as cores allow)
         # output settings
         "preclassify": 0.0,  # apply classifier before signal extraction with probability 0.3
         "save_mat": False,  # whether to save output as matlab files
         "save_NWB": False,  # whether to save output as NWB file
+        "save_npz": False,  # whether to save the outputs of each plane in a single outputs.npz instead of one .npy file each
         "combined": True,  # combine multiple planes into a single result /single canvas for GUI
         "aspect": 1.0,  # um/pixels in X / um/pixels in Y (for correct aspect ratio in GUI)
         # bidirectional phase offset
@@ -63,6 +70,7 @@ def default_ops():
         "th_badframes": 1.0,  # this parameter determines which frames to exclude when determining cropping - set it smaller to exclude more frames
         "norm_frames": True,  # normalize frames when detecting shifts
         "force_refImg": False,  # if True, use refImg stored in ops if available
+        "refimg_cache": False,  # if True, cache the reference image in save_path/_cache and reuse it on the same movie
         "pad_fft": False,  # if True, pads image during FFT part of registration
         # non rigid registration settings
         "nonrigid": True,  # whether to use nonrigid registration
@@ -77,6 +85,7 @@ def default_ops():
         # cell detection settings with suite2p
         "roidetect": True,  # whether or not to run ROI extraction
         "spikedetect": True,  # whether or not to run spike deconvolution
+        "oasis_gpu": False,  # whether to run the spike deconvolution on the GPU with cupy (if installed)
         "sparse_mode": True,  # whether or not to run sparse_mode
         "spatial_scale": 0,  # 0: multi-scale; 1: 6 pixels, 2: 12 pixels, 3: 24 pixels, 4: 48 pixels
         "connected": True,  # whether or not to keep ROIs fully connected (set to 0 for dendrites)
@@ -114,3 +123,25 @@ def default_ops():
         "prctile_baseline": 8.0,  # optional (whether to use a percentile baseline)
         "neucoeff": 0.7,  # neuropil coefficient
     }
+
+
+# defaults built once, only exposed read-only (or merged into a new dict with with_default_ops)
+_default_ops = default_ops()
+_mutable_default_keys = tuple(key for key, value in _default_ops.items() if isinstance(value, (list, dict)))
+
+
+def default_ops_template():
+    """read-only default options, built once and shared (copy mutable values before modifying them)"""
+    return MappingProxyType(_default_ops)
+
+
+def with_default_ops(ops):
+    """returns a new dict of ops completed with the default options, without rebuilding the defaults
+
+    mutable default values (lists) that are not set in ops are copied, so that the defaults are never modified
+    """
+    ops = {**_default_ops, **ops}
+    for key in _mutable_default_keys:
+        if ops[key] is _default_ops[key]:
+            ops[key] = copy(ops[key])
+    return ops
@@ -2,5 +2,6 @@
 Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer and Marius Pachitariu.
 """
 from .dcnv import preprocess, oasis
+from .oasis_cuda import oasis_cuda, HAS_CUPY
 from .extract import create_masks_and_extract, enhanced_mean_image, extract_traces_from_masks, extraction_wrapper
 from .masks import create_cell_mask, create_neuropil_masks, create_cell_pix
\ No newline at end of file
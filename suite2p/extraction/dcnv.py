@@ -3,7 +3,7 @@ Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer a
 """
 import numpy as np
 from numba import njit, prange
-from scipy.ndimage import maximum_filter1d, minimum_filter1d, gaussian_filter
+from scipy.ndimage import gaussian_filter
 
 
 @njit([
@@ -89,6 +89,77 @@ def oasis(F: np.ndarray, batch_size: int, tau: float, fs: float) -> np.ndarray:
     return S
 
 
+@njit(cache=True)
+def reflect_pad(x, xpad, left):
+    """ copies x into xpad with scipy's "reflect" boundary mode (d c b a | a b c d | d c b a), 
+    x[0] is at xpad[left] """
+    NT = x.shape[0]
+    for j in range(xpad.shape[0]):
+        i = j - left
+        while i < 0 or i >= NT:
+            i = -i - 1 if i < 0 else 2 * NT - i - 1
+        xpad[j] = x[i]
+
+
+@njit(cache=True)
+def extremum_filter_trace(xpad, out, g, h, use_max):
+    """ running min (or max) over windows of length len(xpad) - len(out) + 1 of xpad, in O(T) (van Herk / Gil-Werman)
+
+    with xpad reflect-padded by win // 2 on the left, same output as
+    scipy.ndimage.minimum_filter1d / maximum_filter1d (mode "reflect")
+    """
+    L = xpad.shape[0]
+    win = L - out.shape[0] + 1
+    # running extremum from the start (g) and from the end (h) of each block of length win
+    for b in range(0, L, win):
+        e = min(b + win, L)
+        g[b] = xpad[b]
+        for j in range(b + 1, e):
+            g[j] = max(g[j - 1], xpad[j]) if use_max else min(g[j - 1], xpad[j])
+        h[e - 1] = xpad[e - 1]
+        for j in range(e - 2, b - 1, -1):
+            h[j] = max(h[j + 1], xpad[j]) if use_max else min(h[j + 1], xpad[j])
+    for i in range(out.shape[0]):
+        out[i] = max(h[i], g[i + win - 1]) if use_max else min(h[i], g[i + win - 1])
+
+
+@njit(parallel=True, cache=True)
+def maximin_matrix(F, Flow, weights, win):
+    """ gaussian smoothing then min and max filtering in time of each trace, parallelized over neurons with prange
+
+    same output as gaussian_filter1d, minimum_filter1d and maximum_filter1d (mode "reflect"),
+    the gaussian is applied in float64 like scipy
+    """
+    NN, NT = F.shape
+    radius = weights.shape[0] // 2
+    left = win // 2
+    for n in prange(NN):
+        xpad = np.empty(NT + 2 * radius, dtype=np.float64)
+        reflect_pad(F[n], xpad, radius)
+        # loop over the kernel outside so that the inner loop vectorizes
+        acc = weights[radius] * xpad[radius:radius + NT]
+        for k in range(1, radius + 1):
+            acc += (xpad[radius - k:radius - k + NT] + xpad[radius + k:radius + k + NT]) * weights[radius + k]
+        smooth = np.empty(NT + win - 1, dtype=Flow.dtype)
+        reflect_pad(acc.astype(Flow.dtype), smooth, left)
+        g = np.empty(NT + win - 1, dtype=Flow.dtype)
+        h = np.empty(NT + win - 1, dtype=Flow.dtype)
+        fmin = np.empty(NT + win - 1, dtype=Flow.dtype)
+        extremum_filter_trace(smooth, fmin[left:left + NT], g, h, False)
+        reflect_pad(fmin[left:left + NT].copy(), fmin, left)
+        extremum_filter_trace(fmin, Flow[n], g, h, True)
+
+
+def gaussian_weights(sigma: float, truncate: float = 4.0) -> np.ndarray:
+    """ normalized gaussian kernel, same as scipy.ndimage.gaussian_filter1d (no smoothing if sigma is 0) """
+    if sigma <= 0:
+        return np.ones(1, np.float64)
+    radius = int(truncate * float(sigma) + 0.5)
+    x = np.arange(-radius, radius + 1)
+    weights = np.exp(-0.5 / float(sigma)**2 * x**2)
+    return weights / weights.sum()
+
+
 def preprocess(F: np.ndarray, baseline: str, win_baseline: float, sig_baseline: float,
                fs: float, prctile_baseline: float = 8) -> np.ndarray:
     """ preprocesses fluorescence traces for spike deconvolution
@@ -125,9 +196,8 @@ def preprocess(F: np.ndarray, baseline: str, win_baseline: float, sig_baseline:
     """
     win = int(win_baseline * fs)
     if baseline == "maximin":
-        Flow = gaussian_filter(F, [0., sig_baseline])
-        Flow = minimum_filter1d(Flow, win)
-        Flow = maximum_filter1d(Flow, win)
+        Flow = np.empty_like(F)
+        maximin_matrix(F, Flow, gaussian_weights(sig_baseline), win)
     elif baseline == "constant":
         Flow = gaussian_filter(F, [0., sig_baseline])
         Flow = np.amin(Flow)
@@ -226,8 +226,9 @@ def extraction_wrapper(
 
     ##TODO : ADD MONKEY PATCH OR EXTRA FUNCTION HERE TO CALCULATE neucoeff of the neuron
 
-    # subtract neuropil
-    dF = F - ops["neucoeff"] * Fneu
+    # subtract neuropil (dF = F - neucoeff * Fneu, with a single temporary)
+    dF = np.multiply(Fneu, ops["neucoeff"], dtype=F.dtype)
+    np.subtract(F, dF, out=dF)
 
     # compute activity statistics for classifier
     sk = stats.skew(dF, axis=1)
@@ -0,0 +1,110 @@
+"""
+Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer and Marius Pachitariu.
+"""
+from importlib.util import find_spec
+
+import numpy as np
+
+# cupy is only imported when oasis_cuda is called
+HAS_CUPY = find_spec("cupy") is not None
+
+# same algorithm as dcnv.oasis_trace, one thread per neuron
+# arrays are time x neurons so that neighbouring threads read neighbouring addresses
+_oasis_source = r"""
+extern "C" __global__
+void oasis_ar1(const float* F, float* S, float* v, float* w, int* t, float* l,
+               const int NN, const int NT, const double g) {
+    const int n = blockDim.x * blockIdx.x + threadIdx.x;
+    if (n >= NN) return;
+
+    int ip = 0;
+    for (int it = 0; it < NT; it++) {
+        v[ip * NN + n] = F[it * NN + n];
+        w[ip * NN + n] = 1;
+        t[ip * NN + n] = it;
+        l[ip * NN + n] = 1;
+        while (ip > 0) {
+            const int p = (ip - 1) * NN + n;
+            const int c = ip * NN + n;
+            if (v[p] * exp(g * l[p]) > v[c]) {
+                // violation of the constraint means merging pools
+                const double f1 = exp(g * l[p]);
+                const double f2 = exp(2 * g * l[p]);
+                const double wnew = w[p] + w[c] * f2;
+                v[p] = (v[p] * w[p] + v[c] * w[c] * f1) / wnew;
+                w[p] = wnew;
+                l[p] = l[p] + l[c];
+                ip -= 1;
+            } else {
+                break;
+            }
+        }
+        ip += 1;
+    }
+
+    for (int k = 1; k < ip; k++) {
+        const int p = (k - 1) * NN + n;
+        S[t[k * NN + n] * NN + n] = v[k * NN + n] - v[p] * exp(g * l[p]);
+    }
+}
+"""
+
+_oasis_kernel = None
+
+
+def oasis_cuda(F: np.ndarray, batch_size: int, tau: float, fs: float,
+               threads_per_block: int = 128) -> np.ndarray:
+    """ computes non-negative deconvolution on the GPU with cupy (same as dcnv.oasis)
+
+    no sparsity constraints
+
+    Parameters
+    ----------------
+
+    F : float, 2D array
+        size [neurons x time], in pipeline uses neuropil-subtracted fluorescence
+
+    batch_size : int
+        number of neurons processed per batch
+
+    tau : float
+        timescale of the sensor, used for the deconvolution kernel
+
+    fs : float
+        sampling rate per plane
+
+    threads_per_block : int (optional, default 128)
+        number of neurons per CUDA block
+
+    Returns
+    ----------------
+
+    S : float, 2D array
+        size [neurons x time], deconvolved fluorescence
+
+    """
+    if not HAS_CUPY:
+        raise ImportError("cupy not found; pip install cupy")
+    import cupy as cp
+
+    global _oasis_kernel
+    if _oasis_kernel is None:
+        _oasis_kernel = cp.RawKernel(_oasis_source, "oasis_ar1")
+
+    NN, NT = F.shape
+    # same as oasis_trace: tau * fs in float32, the division in float64
+    g = -1. / float(np.float32(tau) * np.float32(fs))
+    S = np.zeros((NN, NT), dtype=np.float32)
+    for i in range(0, NN, batch_size):
+        f = cp.asarray(np.ascontiguousarray(F[i:i + batch_size].T, dtype=np.float32))
+        nn = f.shape[1]
+        v = cp.empty((NT, nn), dtype=cp.float32)
+        w = cp.empty((NT, nn), dtype=cp.float32)
+        t = cp.empty((NT, nn), dtype=cp.int32)
+        l = cp.empty((NT, nn), dtype=cp.float32)
+        s = cp.zeros((NT, nn), dtype=cp.float32)
+        nblocks = (nn + threads_per_block - 1) // threads_per_block
+        _oasis_kernel((nblocks,), (threads_per_block,),
+                      (f, s, v, w, t, l, np.int32(nn), np.int32(NT), g))
+        S[i:i + batch_size] = cp.asnumpy(s).T
+    return S
@@ -4,10 +4,10 @@ Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer a
 from .h5 import h5py_to_binary
 from .raw import raw_to_binary
 from .nwb import save_nwb, read_nwb, nwb_to_binary
-from .save import combined, compute_dydx, save_mat
+from .save import combined, compute_dydx, load_outputs, save_mat
 from .sbx import sbx_to_binary
 from .movie import movie_to_binary
 from .tiff import mesoscan_to_binary, ome_to_binary, tiff_to_binary, generate_tiff_filename, save_tiff
 from .nd2 import nd2_to_binary
-from .binary import BinaryFile, BinaryFileCombined
+from .binary import BinaryFile, BinaryFileCombined, prefetch
 from .server import send_jobs
@@ -5,7 +5,9 @@ from typing import Optional, Tuple, Sequence
 from contextlib import contextmanager
 from tifffile import TiffWriter
 
+import mmap
 import os
+import threading
 
 import numpy as np
 
@@ -123,6 +125,29 @@ class BinaryFile:
         indices, *crop = items
         return self.file[indices]
 
+    def read_crop(self, inds: np.ndarray, yslice: slice = slice(None),
+                  xslice: slice = slice(None), dtype=None) -> np.ndarray:
+        """
+        Returns the frames at inds cropped to (yslice, xslice), cropping at read time on the memmap
+        so that only the cropped pixels are copied out of the file.
+
+        Parameters
+        ----------
+        inds: int array
+            The frame indices to read
+        yslice: slice
+            The crop along y
+        xslice: slice
+            The crop along x
+        dtype: numpy dtype
+            The dtype of the returned frames (default: the dtype of the file)
+
+        Returns
+        -------
+        frames: len(inds) x (cropped) Ly x (cropped) Lx, C-contiguous
+        """
+        return np.ascontiguousarray(self.file[inds, yslice, xslice], dtype=dtype or self.file.dtype)
+
     def sampled_mean(self) -> float:
         """
         Returns the sampled mean.
@@ -225,6 +250,43 @@ def binned_mean(mov: np.ndarray, bin_size) -> np.ndarray:
     return mov.reshape(-1, bin_size, Ly, Lx).astype(np.float32).mean(axis=1)
 
 
+def _read_ahead(filenames: Sequence[str], nbytes: int) -> None:
+    """reads the first nbytes of the files into the page cache (best effort, errors are ignored)"""
+    for filename in filenames:
+        try:
+            length = min(nbytes, os.path.getsize(filename))
+            if length == 0:
+                continue
+            if hasattr(os, "posix_fadvise"):
+                fd = os.open(filename, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            else:
+                with open(filename, "rb") as f, mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                        mm.madvise(mmap.MADV_WILLNEED)
+                    else:
+                        # no read-ahead hint (e.g. Windows): touch one byte per allocation block
+                        for i in range(0, length, mmap.ALLOCATIONGRANULARITY):
+                            mm[i]
+        except OSError:
+            pass
+
+
+def prefetch(filenames: Sequence[str], nbytes: int) -> threading.Thread:
+    """starts reading the first nbytes of the existing files in filenames into the page cache in a
+    background thread, so that opening them later does not stall on cold reads
+
+    only the start of the files is read, to not evict the pages of the data currently processed
+    """
+    filenames = [f for f in filenames if f and os.path.isfile(f)]
+    thread = threading.Thread(target=_read_ahead, args=(filenames, int(nbytes)), daemon=True)
+    thread.start()
+    return thread
+
+
 @contextmanager
 def temporary_pointer(file):
     """context manager that resets file pointer location to its original place upon exit."""
@@ -3,16 +3,14 @@ Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer a
 """
 import math
 
-try:
-    import h5py
-    HAS_H5PY=True
-except:
-    HAS_H5PY=False
+from importlib.util import find_spec
 import numpy as np
 import os
 
 from .utils import init_ops, find_files_open_binaries
 
+HAS_H5PY = find_spec("h5py") is not None
+
 
 def h5py_to_binary(ops):
     """  finds h5 files and writes them to binaries
@@ -31,6 +29,7 @@ def h5py_to_binary(ops):
     """
     if not HAS_H5PY:
         raise ImportError("h5py is required for this file type, please 'pip install h5py'")
+    import h5py
 
     ops1 = init_ops(ops)
 
@@ -1,14 +1,11 @@
-try:
-    import cv2
-    HAS_CV2 = True 
-except:
-    HAS_CV2 = False 
-
+from importlib.util import find_spec
 import numpy as np
 import time
 from typing import Optional, Tuple, Sequence
 from .utils import find_files_open_binaries, init_ops
 
+HAS_CV2 = find_spec("cv2") is not None
+
 class VideoReader:
     """ Uses cv2 to read video files """
     def __init__(self, filenames: list):
@@ -19,6 +16,8 @@ class VideoReader:
         filenames : int
             list of video files
         """
+        import cv2
+
         cumframes = [0]
         containers = []
         Ly = []
@@ -84,6 +83,8 @@ class VideoReader:
         cframes : np.array
             start and stop of frames to read, or consecutive list of frames to read
         """
+        import cv2
+
         cframes = np.maximum(0, np.minimum(self.n_frames - 1, cframes))
         cframes = np.arange(cframes[0], cframes[-1] + 1).astype(int)
         # find which video the frames exist in (ivids is length of cframes)
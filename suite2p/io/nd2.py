@@ -5,14 +5,11 @@ import os
 import gc
 import math
 import time
+from importlib.util import find_spec
 import numpy as np
 from . import utils
 
-try:
-    import nd2 
-    ND2 = True
-except ImportError:
-    ND2 = False
+ND2 = find_spec("nd2") is not None
 
 def nd2_to_binary(ops):
     """finds nd2 files and writes them to binaries
@@ -31,6 +28,8 @@ def nd2_to_binary(ops):
             "nframes", "meanImg", "meanImg_chan2"
     """
 
+    import nd2
+
     t0 = time.time()
     # copy ops to list where each element is ops for each plane
     ops1 = utils.init_ops(ops)
@@ -5,6 +5,7 @@ import datetime
 import gc
 import os
 import time
+from importlib.util import find_spec
 from pathlib import Path
 
 import numpy as np
@@ -14,23 +15,10 @@ from natsort import natsorted
 from .. import run_s2p
 from ..detection.stats import roi_stats
 from . import utils
+from .save import load_outputs
 from .. import run_s2p, default_ops
 
-try:
-    from pynwb import NWBHDF5IO, NWBFile
-    from pynwb.base import Images
-    from pynwb.image import GrayscaleImage
-    from pynwb.ophys import (
-        Fluorescence,
-        ImageSegmentation,
-        OpticalChannel,
-        RoiResponseSeries,
-        TwoPhotonSeries,
-    )
-
-    NWB = True
-except ModuleNotFoundError:
-    NWB = False
+NWB = find_spec("pynwb") is not None
 
 
 def nwb_to_binary(ops):
@@ -55,6 +43,9 @@ def nwb_to_binary(ops):
 
     """
 
+    from pynwb import NWBHDF5IO
+    from pynwb.ophys import TwoPhotonSeries
+
     # force 1 plane 1 chan for now
     ops["nplanes"] = 1
     ops["nchannels"] = 1
@@ -143,6 +134,8 @@ def nwb_to_binary(ops):
 
 def read_nwb(fpath):
     """read NWB file for use in the GUI"""
+    from pynwb import NWBHDF5IO
+
     with NWBHDF5IO(fpath, "r") as fio:
         nwbfile = fio.read()
 
@@ -303,6 +296,17 @@ def save_nwb(save_folder):
     nchannels = min([ops["nchannels"] for ops in ops1])
 
     if NWB and not ops1[0]["mesoscan"]:
+        from pynwb import NWBHDF5IO, NWBFile
+        from pynwb.base import Images
+        from pynwb.image import GrayscaleImage
+        from pynwb.ophys import (
+            Fluorescence,
+            ImageSegmentation,
+            OpticalChannel,
+            RoiResponseSeries,
+            TwoPhotonSeries,
+        )
+
         if len(ops1) > 1:
             multiplane = True
         else:
@@ -373,29 +377,26 @@ def save_nwb(save_folder):
             name="ophys", description="optical physiology processed data")
         ophys_module.add(img_seg)
 
-        file_strs = ["F.npy", "Fneu.npy", "spks.npy"]
-        file_strs_chan2 = ["F_chan2.npy", "Fneu_chan2.npy"]
+        file_strs = ["F", "Fneu", "spks"]
+        file_strs_chan2 = ["F_chan2", "Fneu_chan2"]
         traces, traces_chan2 = [], []
         ncells = np.zeros(len(ops1), dtype=np.int_)
         Nfr = np.array([ops["nframes"] for ops in ops1]).max()
         for iplane, ops in enumerate(ops1):
+            # .npy files or outputs.npz (ops["save_npz"])
+            outputs = load_outputs(plane_folders[iplane])
             if iplane == 0:
-                iscell = np.load(os.path.join(ops["save_path"], "iscell.npy"))
+                iscell = outputs["iscell"]
                 for fstr in file_strs:
-                    traces.append(np.load(os.path.join(ops["save_path"], fstr)))
+                    traces.append(outputs[fstr])
                 if nchannels > 1:
                     for fstr in file_strs_chan2:
-                        traces_chan2.append(
-                            np.load(plane_folders[iplane].joinpath(fstr)))
+                        traces_chan2.append(outputs[fstr])
                 PlaneCellsIdx = iplane * np.ones(len(iscell))
             else:
-                iscell = np.append(
-                    iscell,
-                    np.load(os.path.join(ops["save_path"], "iscell.npy")),
-                    axis=0,
-                )
+                iscell = np.append(iscell, outputs["iscell"], axis=0)
                 for i, fstr in enumerate(file_strs):
-                    trace = np.load(os.path.join(ops["save_path"], fstr))
+                    trace = outputs[fstr]
                     if trace.shape[1] < Nfr:
                         fcat = np.zeros((trace.shape[0], Nfr - trace.shape[1]),
                                         "float32")
@@ -403,16 +404,11 @@ def save_nwb(save_folder):
                     traces[i] = np.append(traces[i], trace, axis=0)
                 if nchannels > 1:
                     for i, fstr in enumerate(file_strs_chan2):
-                        traces_chan2[i] = np.append(
-                            traces_chan2[i],
-                            np.load(plane_folders[iplane].joinpath(fstr)),
-                            axis=0,
-                        )
+                        traces_chan2[i] = np.append(traces_chan2[i], outputs[fstr], axis=0)
                 PlaneCellsIdx = np.append(
                     PlaneCellsIdx, iplane * np.ones(len(iscell) - len(PlaneCellsIdx)))
 
-            stat = np.load(os.path.join(ops["save_path"], "stat.npy"),
-                           allow_pickle=True)
+            stat = outputs["stat"]
             ncells[iplane] = len(stat)
             for n in range(ncells[iplane]):
                 if multiplane:
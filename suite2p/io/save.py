@@ -54,6 +54,20 @@ def save_mat(ops, stat, F, Fneu, spks, iscell, redcell,
             })
 
 
+def load_outputs(fpath):
+    """loads the outputs of pipeline saved in the plane folder fpath, either in
+    outputs.npz (ops["save_npz"]) or in one .npy file per output"""
+    npz_file = os.path.join(fpath, "outputs.npz")
+    if os.path.isfile(npz_file):
+        with np.load(npz_file, allow_pickle=True) as f:
+            return {key: f[key] for key in f.files}
+    outputs = {}
+    for key in ["stat", "F", "Fneu", "spks", "iscell", "F_chan2", "Fneu_chan2"]:
+        if os.path.isfile(os.path.join(fpath, f"{key}.npy")):
+            outputs[key] = np.load(os.path.join(fpath, f"{key}.npy"), allow_pickle=True)
+    return outputs
+
+
 def compute_dydx(ops1):
     ops = ops1[0].copy()
     dx = np.zeros(len(ops1), np.int64)
@@ -122,9 +136,10 @@ def combined(save_folder, save=True):
     ii = 0
     for k, ops in enumerate(ops1):
         fpath = plane_folders[k]
-        if not os.path.exists(os.path.join(fpath, "stat.npy")):
+        outputs = load_outputs(fpath)
+        if "stat" not in outputs:
             continue
-        stat0 = np.load(os.path.join(fpath, "stat.npy"), allow_pickle=True)
+        stat0 = outputs["stat"]
         xrange = np.arange(dx[k], dx[k] + Lx[k])
         yrange = np.arange(dy[k], dy[k] + Ly[k])
         meanImg[np.ix_(yrange, xrange)] = ops["meanImg"]
@@ -147,10 +162,7 @@ def combined(save_folder, save=True):
             stat0[j]["med"][0] += dy[k]
             stat0[j]["med"][1] += dx[k]
             stat0[j]["iplane"] = k
-        F0 = np.load(os.path.join(fpath, "F.npy"))
-        Fneu0 = np.load(os.path.join(fpath, "Fneu.npy"))
-        spks0 = np.load(os.path.join(fpath, "spks.npy"))
-        iscell0 = np.load(os.path.join(fpath, "iscell.npy"))
+        F0, Fneu0, spks0, iscell0 = outputs["F"], outputs["Fneu"], outputs["spks"], outputs["iscell"]
         if os.path.isfile(os.path.join(fpath, "redcell.npy")):
             redcell0 = np.load(os.path.join(fpath, "redcell.npy"))
             hasred = True
@@ -2,16 +2,13 @@
 Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer and Marius Pachitariu.
 """
 import os
+from importlib.util import find_spec
 
 import numpy as np
 
 from .utils import init_ops, find_files_open_binaries
 
-try:
-    from sbxreader import sbx_memmap
-    HAS_SBX = True
-except:
-    HAS_SBX = False
+HAS_SBX = find_spec("sbxreader") is not None
     
 
 def sbx_to_binary(ops, ndeadcols=-1, ndeadrows=0):
@@ -31,6 +28,7 @@ def sbx_to_binary(ops, ndeadcols=-1, ndeadrows=0):
     """
     if not HAS_SBX:
         raise ImportError("sbxreader is required for this file type, please 'pip install sbxreader'")
+    from sbxreader import sbx_memmap
 
     ops1 = init_ops(ops)
     # the following should be taken from the metadata and not needed but the files are initialized before...
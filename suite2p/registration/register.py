@@ -606,6 +606,8 @@ def registration_wrapper(
         Valid ranges for registration along x-axis of frames
 
     """
+    utils.set_device(ops.get("use_gpu", False))
+
     f_alt_in, f_align_out, f_alt_out = None, None, None
     if f_reg_chan2 is None or not align_by_chan2:
         if f_raw is None:
@@ -80,13 +80,35 @@ except:
         -------
         convolved_data: nImg x Ly x Lx
         """
-        mov_fft = torch.from_numpy(mov)
+        mov_fft = torch.from_numpy(mov).to(_device)
         mov_fft = torch_fft2(mov_fft, dim=(-2, -1))
         #mov_fft = torch_fft(torch_fft(mov_fft, dim=-1), dim=-2)
-        mov_fft /= (eps + torch.abs(mov_fft))
-        mov_fft *= torch.from_numpy(img)
+        mov_fft /= (eps.to(_device) + torch.abs(mov_fft))
+        mov_fft *= torch.from_numpy(img).to(_device)
         mov_fft = torch.real(torch_ifft2(mov_fft, dim=(-2, -1)))
-        return mov_fft.numpy()
+        return mov_fft.cpu().numpy()
+
+
+_device = torch.device("cpu")
+
+
+def set_device(use_gpu: bool = False) -> torch.device:
+    """
+    Sets the device used by the pytorch phase-correlation (cuda if use_gpu and a GPU is available, else cpu).
+    The GPU is only used by the pytorch FFT backend (when mkl_fft is not installed).
+
+    Parameters
+    ----------
+    use_gpu: bool
+        whether to run the phase-correlation on the GPU
+
+    Returns
+    -------
+    device: torch.device
+    """
+    global _device
+    _device = torch.device("cuda" if use_gpu and torch.cuda.is_available() else "cpu")
+    return _device
 
 
 @vectorize([complex64(complex64, complex64)], nopython=True, target="parallel")
@@ -4,61 +4,107 @@ Copyright © 2023 Howard Hughes Medical Institute, Authored by Carsen Stringer a
 
 import os
 import shutil
+import hashlib
+import json
+import multiprocessing
 import time
 from natsort import natsorted
 from datetime import datetime
 from getpass import getpass
 import pathlib
 import contextlib
+import logging
+import logging.handlers
+from importlib.util import find_spec
+import numba
 import numpy as np
+import torch
 
 # from scipy.io import savemat
 
 from . import extraction, io, registration, detection, classification
-from .default_ops import default_ops
+from .default_ops import default_ops, default_ops_template, with_default_ops
 
+# optional file format backends, only imported by the converters that use them
+HAS_NWB = find_spec("pynwb") is not None
+HAS_ND2 = find_spec("nd2") is not None
+HAS_H5PY = find_spec("h5py") is not None
+HAS_SBX = find_spec("sbxreader") is not None
+HAS_CV2 = find_spec("cv2") is not None
 
-try:
-    import pynwb
-
-    HAS_NWB = True
-except ImportError:
-    HAS_NWB = False
-
-try:
-    import nd2
-
-    HAS_ND2 = True
-except ImportError:
-    HAS_ND2 = False
-
-try:
-    import h5py
-
-    HAS_H5PY = True
-except ImportError:
-    HAS_H5PY = False
-
-try:
-    import sbxreader
-
-    HAS_SBX = True
-except ImportError:
-    HAS_SBX = False
-
-try:
-    import cv2
-
-    HAS_CV2 = True
-except ImportError:
-    HAS_CV2 = False
-
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from functools import partial
 from pathlib import Path
 from logging import getLogger
 
 print = partial(print, flush=True)
 
+# writes the outputs of pipeline in the background (np.save releases the GIL while writing)
+_save_pool = ThreadPoolExecutor(max_workers=2)
+
+
+def select_classfile(ops):
+    """path of the classifier file to use with the settings in ops"""
+    logger = getLogger("suite2p")
+    ops_classfile = ops.get("classifier_path")
+    builtin_classfile = classification.builtin_classfile
+    user_classfile = classification.user_classfile
+    if ops_classfile:
+        logger.info(f"NOTE: applying classifier {str(ops_classfile)}")
+        classfile = ops_classfile
+    elif ops["use_builtin_classifier"] or not user_classfile.is_file():
+        logger.info(f"NOTE: Applying builtin classifier at {str(builtin_classfile)}")
+        classfile = builtin_classfile
+    else:
+        logger.info(f"NOTE: applying default {str(user_classfile)}")
+        classfile = user_classfile
+    return classfile
+
+
+def save_ops(ops):
+    """save ops to ops["ops_path"] (if set), writing to a temporary file first so that
+    a crash while saving does not leave a truncated ops.npy"""
+    if not ops.get("ops_path"):
+        return
+    tmp_path = str(ops["ops_path"]) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, ops)
+    os.replace(tmp_path, ops["ops_path"])
+
+
+# settings that determine the reference image computed from a given movie
+REFIMG_CACHE_KEYS = [
+    "nimg_init",
+    "do_bidiphase",
+    "bidiphase",
+    "bidi_corrected",
+    "1Preg",
+    "pre_smooth",
+    "spatial_hp_reg",
+    "spatial_taper",
+    "smooth_sigma",
+    "smooth_sigma_time",
+    "maxregshift",
+    "norm_frames",
+    "functional_chan",
+    "align_by_chan",
+]
+
+
+def refimg_cache_file(ops, f_align):
+    """path of the cached reference image for the frames in f_align, registered with the settings in ops
+
+    the cache is keyed on the REFIMG_CACHE_KEYS settings and on the frames sampled to compute the
+    reference image, and stored in the "_cache" folder of ops["save_path"]
+    """
+    n_frames = f_align.shape[0]
+    inds = np.linspace(0, n_frames, 1 + np.minimum(ops["nimg_init"], n_frames), dtype=int)[:-1]
+    ref_ops = {key: ops[key] for key in REFIMG_CACHE_KEYS if key in ops}
+    key = hashlib.blake2b(json.dumps(ref_ops, sort_keys=True, default=str).encode(), digest_size=16)
+    key.update(str(f_align.shape).encode())
+    key.update(np.ascontiguousarray(f_align[inds]).tobytes())
+    return os.path.join(ops["save_path"], "_cache", f"refimg_{key.hexdigest()}.npy")
+
 
 def pipeline(
     f_reg, f_raw=None, f_reg_chan2=None, f_raw_chan2=None, run_registration=True, ops=default_ops(), stat=None
@@ -89,21 +135,13 @@ def pipeline(
     logger = getLogger("suite2p")
 
     plane_times = {}
+    saves = []
     t1 = time.time()
 
-    # Select file for classification
-    ops_classfile = ops.get("classifier_path")
-    builtin_classfile = classification.builtin_classfile
-    user_classfile = classification.user_classfile
-    if ops_classfile:
-        logger.info(f"NOTE: applying classifier {str(ops_classfile)}")
-        classfile = ops_classfile
-    elif ops["use_builtin_classifier"] or not user_classfile.is_file():
-        logger.info(f"NOTE: Applying builtin classifier at {str(builtin_classfile)}")
-        classfile = builtin_classfile
-    else:
-        logger.info(f"NOTE: applying default {str(user_classfile)}")
-        classfile = user_classfile
+    # use classifier loaded once for all planes by run_s2p, else select file for classification
+    classfile = ops.pop("_classifier", None)
+    if classfile is None:
+        classfile = select_classfile(ops)
 
     if run_registration:
         raw = f_raw is not None
@@ -119,6 +157,20 @@ def pipeline(
         refImg = ops["refImg"] if "refImg" in ops and ops.get("force_refImg", False) else None
 
         align_by_chan2 = ops["functional_chan"] != ops["align_by_chan"]
+
+        # reuse reference image computed on the same movie with the same settings
+        refimg_cache = None
+        if ops.get("refimg_cache") and ops.get("save_path"):
+            f_align = (f_raw_chan2 if raw else f_reg_chan2) if align_by_chan2 else (f_raw if raw else f_reg)
+            refimg_cache = refimg_cache_file(ops, f_align)
+            if refImg is None and os.path.isfile(refimg_cache):
+                cached = np.load(refimg_cache, allow_pickle=True).item()
+                logger.info(f"NOTE: using cached reference image {refimg_cache}")
+                refImg = cached["refImg"]
+                ops["bidiphase"] = cached["bidiphase"]
+        # only cache a reference image computed from the frames (not forced or loaded from the cache)
+        write_refimg_cache = refimg_cache is not None and refImg is None
+
         registration_outputs = registration.registration_wrapper(
             f_reg,
             f_raw=f_raw,
@@ -134,8 +186,9 @@ def pipeline(
         meanImgE = registration.compute_enhanced_mean_image(ops["meanImg"].astype(np.float32), ops)
         ops["meanImgE"] = meanImgE
 
-        if ops.get("ops_path"):
-            np.save(ops["ops_path"], ops)
+        if write_refimg_cache:
+            os.makedirs(os.path.dirname(refimg_cache), exist_ok=True)
+            np.save(refimg_cache, {"refImg": ops["refImg"], "bidiphase": ops["bidiphase"]})
 
         plane_times["registration"] = time.time() - t11
         logger.info("Finished in %0.2f sec" % plane_times["registration"])
@@ -147,10 +200,14 @@ def pipeline(
             logger.info("(making mean image (excluding bad frames)")
             nsamps = min(n_frames, 1000)
             inds = np.linspace(0, n_frames, 1 + nsamps).astype(np.int64)[:-1]
-            if align_by_chan2:
-                refImg = f_reg_chan2[inds].astype(np.float32).mean(axis=0)
-            else:
-                refImg = f_reg[inds].astype(np.float32).mean(axis=0)
+            # running mean over chunks of frames to avoid loading all nsamps frames at once
+            f_mean = f_reg_chan2 if align_by_chan2 else f_reg
+            # int16 frames are summed exactly in int32 (at most 1000 frames), other inputs in float64
+            acc_dtype = np.int32 if np.issubdtype(f_mean.dtype, np.integer) else np.float64
+            refImg = np.zeros((Ly, Lx), acc_dtype)
+            for chunk in np.array_split(inds, max(1, len(inds) // 64)):
+                refImg += f_mean[chunk].sum(axis=0, dtype=acc_dtype)
+            refImg = (refImg / len(inds)).astype(np.float32)
             registration_outputs = registration.registration_wrapper(
                 f_reg,
                 f_raw=None,
@@ -160,8 +217,6 @@ def pipeline(
                 align_by_chan2=align_by_chan2,
                 ops=ops,
             )
-            if ops.get("ops_path"):
-                np.save(ops["ops_path"], ops)
             plane_times["two_step_registration"] = time.time() - t11
             logger.info("Finished in %0.2f sec" % plane_times["two_step_registration"])
 
@@ -173,13 +228,19 @@ def pipeline(
             # n frames to pick from full movie
             nsamp = min(2000 if n_frames < 5000 or Ly > 700 or Lx > 700 else 5000, n_frames)
             inds = np.linspace(0, n_frames - 1, nsamp).astype("int")
-            mov = f_reg[inds]
-            mov = mov[:, ops["yrange"][0] : ops["yrange"][-1], ops["xrange"][0] : ops["xrange"][-1]]
+            yslice = slice(ops["yrange"][0], ops["yrange"][-1])
+            xslice = slice(ops["xrange"][0], ops["xrange"][-1])
+            if isinstance(f_reg, io.BinaryFile):
+                mov = f_reg.read_crop(inds, yslice, xslice)
+            else:
+                # contiguous copy of the crop, kept in the movie dtype: the metrics convert it to float32
+                mov = np.ascontiguousarray(f_reg[inds][:, yslice, xslice])
             ops = registration.get_pc_metrics(mov, ops)
             plane_times["registration_metrics"] = time.time() - t0
             logger.info("Finished in, %0.2f sec." % plane_times["registration_metrics"])
-            if ops.get("ops_path"):
-                np.save(ops["ops_path"], ops)
+
+        # save ops once for registration, two-step registration and metrics
+        save_ops(ops)
 
     if ops.get("roidetect", True):
         n_frames, Ly, Lx = f_reg.shape
@@ -204,9 +265,14 @@ def pipeline(
             stat, F, Fneu, F_chan2, Fneu_chan2 = extraction.extraction_wrapper(
                 stat, f_reg, f_reg_chan2=f_reg_chan2, ops=ops
             )
+            # keep traces in float32 for deconvolution and saving (no copy if they already are)
+            F = np.ascontiguousarray(F, dtype=np.float32)
+            Fneu = np.ascontiguousarray(Fneu, dtype=np.float32)
+            if f_reg_chan2 is not None:
+                F_chan2 = np.ascontiguousarray(F_chan2, dtype=np.float32)
+                Fneu_chan2 = np.ascontiguousarray(Fneu_chan2, dtype=np.float32)
             # save results
-            if ops.get("ops_path"):
-                np.save(ops["ops_path"], ops)
+            save_ops(ops)
 
             plane_times["extraction"] = time.time() - t11
             logger.info("----------- Finished in %0.2f sec." % plane_times["extraction"])
@@ -228,7 +294,9 @@ def pipeline(
             if ops.get("spikedetect", True):
                 t11 = time.time()
                 logger.info("----------- Starting")
-                dF = F.copy() - ops["neucoeff"] * Fneu
+                # subtract neuropil with a single temporary: dF = F - neucoeff * Fneu
+                dF = np.multiply(Fneu, ops["neucoeff"], dtype=F.dtype)
+                np.subtract(F, dF, out=dF)
                 dF = extraction.preprocess(
                     F=dF,
                     baseline=ops["baseline"],
@@ -237,7 +305,10 @@ def pipeline(
                     fs=ops["fs"],
                     prctile_baseline=ops["prctile_baseline"],
                 )
-                spks = extraction.oasis(F=dF, batch_size=ops["batch_size"], tau=ops["tau"], fs=ops["fs"])
+                if ops.get("oasis_gpu") and extraction.HAS_CUPY:
+                    spks = extraction.oasis_cuda(F=dF, batch_size=ops["batch_size"], tau=ops["tau"], fs=ops["fs"])
+                else:
+                    spks = extraction.oasis(F=dF, batch_size=ops["batch_size"], tau=ops["tau"], fs=ops["fs"])
                 plane_times["deconvolution"] = time.time() - t11
                 logger.info("----------- Total %0.2f sec." % plane_times["deconvolution"])
             else:
@@ -246,20 +317,25 @@ def pipeline(
 
             if ops.get("save_path"):
                 fpath = ops["save_path"]
-                np.save(os.path.join(fpath, "stat.npy"), stat)
-                np.save(os.path.join(fpath, "F.npy"), F)
-                np.save(os.path.join(fpath, "Fneu.npy"), Fneu)
-                np.save(os.path.join(fpath, "iscell.npy"), iscell)
-                np.save(os.path.join(ops["save_path"], "spks.npy"), spks)
+                outputs = dict(stat=stat, F=F, Fneu=Fneu, iscell=iscell, spks=spks)
                 # if second channel, save F_chan2 and Fneu_chan2
                 if "meanImg_chan2" in ops:
-                    np.save(os.path.join(fpath, "F_chan2.npy"), F_chan2)
-                    np.save(os.path.join(fpath, "Fneu_chan2.npy"), Fneu_chan2)
+                    outputs.update(F_chan2=F_chan2, Fneu_chan2=Fneu_chan2)
+                # remove the outputs saved in the other layout by a previous run
+                npy_files = [f"{key}.npy" for key in ["stat", "F", "Fneu", "iscell", "spks", "F_chan2", "Fneu_chan2"]]
+                for fname in npy_files if ops.get("save_npz") else ["outputs.npz"]:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(fpath, fname))
+                if ops.get("save_npz"):
+                    # single archive instead of one file per output
+                    saves.append(_save_pool.submit(np.savez, os.path.join(fpath, "outputs.npz"), **outputs))
+                else:
+                    for key, value in outputs.items():
+                        saves.append(_save_pool.submit(np.save, os.path.join(fpath, f"{key}.npy"), value))
 
             # save as matlab file
             if ops.get("save_mat"):
-                stat = np.load(os.path.join(ops["save_path"], "stat.npy"), allow_pickle=True)
-                iscell = np.load(os.path.join(ops["save_path"], "iscell.npy"))
+                # redcell is only saved to disk by detection
                 redcell = np.load(os.path.join(ops["save_path"], "redcell.npy")) if ops["nchannels"] == 2 else []
                 io.save_mat(ops, stat, F, Fneu, spks, iscell, redcell, F_chan2, Fneu_chan2)
     else:
@@ -268,8 +344,11 @@ def pipeline(
     ops["timing"] = plane_times.copy()
     plane_runtime = time.time() - t1
     ops["timing"]["total_plane_runtime"] = plane_runtime
-    if ops.get("ops_path"):
-        np.save(ops["ops_path"], ops)
+    save_ops(ops)
+
+    # make sure the outputs are written (and raise any error from writing them) before returning
+    for future in saves:
+        future.result()
 
     return ops  # , stat, F, Fneu, F_chan2, Fneu_chan2, spks, iscell, redcell
 
@@ -293,7 +372,7 @@ def run_plane(ops, ops_path=None, stat=None):
     ops : :obj:`dict`
     """
 
-    ops = {**default_ops(), **ops}
+    ops = with_default_ops(ops)
     ops["date_proc"] = datetime.now().astimezone()
     logger = getLogger("suite2p.plane")
     # for running on server or on moved files, specify ops_path
@@ -363,13 +442,13 @@ def run_plane(ops, ops_path=None, stat=None):
 
     if ops.get("move_bin") and ops["save_path"] != ops["fast_disk"]:
         logger.info("moving binary files to save_path")
-        shutil.move(ops["reg_file"], os.path.join(ops["save_path"], "data.bin"))
+        _move_or_reflink(ops["reg_file"], os.path.join(ops["save_path"], "data.bin"))
         if ops["nchannels"] > 1:
-            shutil.move(ops["reg_file_chan2"], os.path.join(ops["save_path"], "data_chan2.bin"))
+            _move_or_reflink(ops["reg_file_chan2"], os.path.join(ops["save_path"], "data_chan2.bin"))
         if "raw_file" in ops:
-            shutil.move(ops["raw_file"], os.path.join(ops["save_path"], "data_raw.bin"))
+            _move_or_reflink(ops["raw_file"], os.path.join(ops["save_path"], "data_raw.bin"))
             if ops["nchannels"] > 1:
-                shutil.move(ops["raw_file_chan2"], os.path.join(ops["save_path"], "data_chan2_raw.bin"))
+                _move_or_reflink(ops["raw_file_chan2"], os.path.join(ops["save_path"], "data_chan2_raw.bin"))
     elif ops.get("delete_bin"):
         logger.info("deleting binary files")
         os.remove(ops["reg_file"])
@@ -382,6 +461,90 @@ def run_plane(ops, ops_path=None, stat=None):
     return ops
 
 
+# ioctl request to clone a file (copy-on-write) on Linux filesystems that support it (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def _copy_in_kernel(fsrc, fdst):
+    """copy fsrc to fdst as a copy-on-write clone if the filesystem allows it, else with copy_file_range
+    (copied inside the kernel, or on the server for NFS / SMB), raising OSError if neither works"""
+    try:
+        import fcntl
+
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return
+    except (ImportError, OSError):
+        # clones only work within one filesystem (e.g. between btrfs subvolumes)
+        pass
+    if not hasattr(os, "copy_file_range"):
+        raise OSError("copy_file_range not available")
+    remaining = os.fstat(fsrc.fileno()).st_size
+    while remaining > 0:
+        copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+        if copied == 0:
+            raise OSError("copy_file_range stopped before the end of the file")
+        remaining -= copied
+
+
+def _move_or_reflink(src, dst):
+    """move src to dst: rename on the same device, else copy in the kernel (clone or copy_file_range)
+    before falling back to copying through user space"""
+    if os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev:
+        os.replace(src, dst)
+        return
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            _copy_in_kernel(fsrc, fdst)
+    except OSError:
+        # no in-kernel copy between these filesystems: copy then delete
+        shutil.move(src, dst)
+        return
+    shutil.copystat(src, dst)
+    os.remove(src)
+
+
+# number of batches of frames of the next plane read ahead while a plane is processed
+PREFETCH_BATCHES = 2
+
+# fewest threads given to each plane when choosing the number of parallel planes (nplanes_parallel=0)
+MIN_THREADS_PER_PLANE = 4
+
+
+class _LogForwarder(logging.Handler):
+    """hands the log records sent by the plane worker processes to the loggers of this process"""
+
+    def emit(self, record):
+        getLogger(record.name).handle(record)
+
+
+def _init_plane_worker(nthreads, log_queue, log_level, gpu_ids=None):
+    """limit the threads of a plane worker process, forward its logs to the main process
+    and restrict it to the next GPU in gpu_ids"""
+    if gpu_ids is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(gpu_ids.get())
+    # for BLAS / OpenMP libraries that start their thread pools later
+    for var in ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]:
+        os.environ[var] = str(nthreads)
+    numba.set_num_threads(min(nthreads, numba.config.NUMBA_NUM_THREADS))
+    torch.set_num_threads(nthreads)
+    logger = getLogger("suite2p")
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(log_level)
+    logger.propagate = False
+
+
+def _load_plane_ops(ops_path, ops):
+    """load the ops of a plane and update them with the settings of the run in ops"""
+    op = np.load(ops_path, allow_pickle=True).item()
+
+    # make sure yrange and xrange are not overwritten
+    for key in default_ops_template().keys():
+        if key not in ["data_path", "save_path0", "fast_disk", "save_folder", "subfolders"]:
+            if key in ops:
+                op[key] = ops[key]
+    return op
+
+
 def run_s2p(ops={}, db={}, server={}):
     """run suite2p pipeline
 
@@ -405,7 +568,7 @@ def run_s2p(ops={}, db={}, server={}):
     """
     logger = getLogger("suite2p")
     t0 = time.time()
-    ops = {**default_ops(), **ops, **db}
+    ops = with_default_ops({**ops, **db})
     if isinstance(ops["diameter"], list) and len(ops["diameter"]) > 1 and ops["aspect"] == 1.0:
         ops["aspect"] = ops["diameter"][0] / ops["diameter"][1]
     logger.debug(db)
@@ -434,7 +597,8 @@ def run_s2p(ops={}, db={}, server={}):
             ops["bin_file"] = os.path.join(f, "data.bin")
             ops["Ly"] = ops["Lys"][i]
             ops["Lx"] = ops["Lxs"][i]
-            nbytesread = np.int64(2 * ops["Ly"] * ops["Lx"])
+            # the size of the binary is the number of frames it holds (it may have been replaced since the last run)
+            nbytesread = np.int64(2) * np.int64(ops["Ly"]) * np.int64(ops["Lx"])
             ops["nframes"] = os.path.getsize(ops["bin_file"]) // nbytesread
             np.save(opf, ops)
         files_found_flag = True
@@ -462,12 +626,15 @@ def run_s2p(ops={}, db={}, server={}):
             "Fneu_chan2.npy",
             "iscell.npy",
             "redcell.npy",
+            "outputs.npz",
         ]
         for p in ops_paths:
             plane_folder = os.path.split(p)[0]
-            for f in files_to_remove:
-                if os.path.exists(os.path.join(plane_folder, f)):
-                    os.remove(os.path.join(plane_folder, f))
+            # list the folder once instead of checking each file
+            with os.scandir(plane_folder) as entries:
+                found = {entry.name for entry in entries if entry.is_file()}
+            for f in found.intersection(files_to_remove):
+                os.remove(os.path.join(plane_folder, f))
     # if not set up files and copy tiffs/h5py to binary
     else:
         if len(ops["h5py"]):
@@ -540,23 +707,79 @@ def run_s2p(ops={}, db={}, server={}):
             io.server.send_jobs(save_folder)
         return None
     else:
-        for ipl, ops_path in enumerate(ops_paths):
-            if ipl in ops["ignore_flyback"]:
-                logger.info("Skipping flyback PLANE", ipl)
-                continue
-            op = np.load(ops_path, allow_pickle=True).item()
-
-            # make sure yrange and xrange are not overwritten
-            for key in default_ops().keys():
-                if key not in ["data_path", "save_path0", "fast_disk", "save_folder", "subfolders"]:
-                    if key in ops:
-                        op[key] = ops[key]
-
-            logger.info("Starting processing plane : %d" % ipl)
-            op = run_plane(op, ops_path=ops_path)
-            logger.info(
-                "Plane %d processed in %0.2f sec (can open in GUI)." % (ipl, op["timing"]["total_plane_runtime"])
+        plane_inds = [ipl for ipl in range(len(ops_paths)) if ipl not in ops["ignore_flyback"]]
+        for ipl in range(len(ops_paths)):
+            if ipl not in plane_inds:
+                logger.info("Skipping flyback PLANE %d" % ipl)
+
+        # the GUI reads the .npy outputs of the planes, not outputs.npz
+        processed_msg = "Plane %d processed in %0.2f sec" + ("." if ops.get("save_npz") else " (can open in GUI).")
+
+        # load the classifier once for all planes
+        classifier = classification.load_classifier(select_classfile(ops)) if ops.get("roidetect", True) else None
+
+        ncpu = os.cpu_count() or 1
+        ngpu = torch.cuda.device_count() if ops.get("use_gpu") else 0
+        nplanes_parallel = ops.get("nplanes_parallel", 1)
+        if nplanes_parallel == 0:
+            if ngpu > 0:
+                nplanes_parallel = ngpu * ops.get("jobs_per_gpu", 1)
+            else:
+                nplanes_parallel = max(1, ncpu // MIN_THREADS_PER_PLANE)
+        nplanes_parallel = min(nplanes_parallel, len(plane_inds))
+
+        if nplanes_parallel <= 1:
+            next_op = _load_plane_ops(ops_paths[plane_inds[0]], ops)
+            for k, ipl in enumerate(plane_inds):
+                op, next_op = next_op, None
+                op["_classifier"] = classifier
+                if k + 1 < len(plane_inds):
+                    # read the first batches of the binaries of the next plane into the page cache while this plane runs
+                    next_op = _load_plane_ops(ops_paths[plane_inds[k + 1]], ops)
+                    nbytes = PREFETCH_BATCHES * next_op["batch_size"] * next_op["Ly"] * next_op["Lx"] * 2
+                    io.prefetch([next_op.get("raw_file"), next_op.get("reg_file")], nbytes)
+                logger.info("Starting processing plane : %d" % ipl)
+                op = run_plane(op, ops_path=ops_paths[ipl])
+                logger.info(processed_msg % (ipl, op["timing"]["total_plane_runtime"]))
+        else:
+            logger.info("Processing %d planes with %d parallel processes" % (len(plane_inds), nplanes_parallel))
+            # spawn fresh worker processes: forking after torch / numba thread pools have started is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            # split the cores between the planes so that numba / torch do not each start a thread per core
+            nthreads = max(1, ncpu // nplanes_parallel)
+            # the worker processes send their log records back to the handlers of this process
+            log_queue = ctx.Queue()
+            log_listener = logging.handlers.QueueListener(log_queue, _LogForwarder())
+            gpu_ids = None
+            if ngpu > 0:
+                # pin each worker process to a GPU before cuda is initialized
+                gpu_ids = ctx.Queue()
+                for iworker in range(nplanes_parallel):
+                    gpu_ids.put(iworker % ngpu)
+                logger.info("Dispatching planes to %d GPUs" % ngpu)
+            pool_kwargs = dict(
+                mp_context=ctx,
+                initializer=_init_plane_worker,
+                initargs=(nthreads, log_queue, getLogger("suite2p").getEffectiveLevel(), gpu_ids),
             )
+            log_listener.start()
+            with contextlib.ExitStack() as stack:
+                stack.callback(log_listener.stop)
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=nplanes_parallel, **pool_kwargs))
+                futures, plane_ops = {}, {}
+                for ipl in plane_inds:
+                    op = _load_plane_ops(ops_paths[ipl], ops)
+                    op["_classifier"] = classifier
+                    # split the workers between the planes running concurrently
+                    if "num_workers" in op:
+                        op["num_workers"] = max(1, op["num_workers"] // nplanes_parallel)
+                    logger.info("Starting processing plane : %d" % ipl)
+                    futures[executor.submit(run_plane, op, ops_path=ops_paths[ipl])] = ipl
+                for future in as_completed(futures):
+                    ipl = futures[future]
+                    plane_ops[ipl] = future.result()
+                    logger.info(processed_msg % (ipl, plane_ops[ipl]["timing"]["total_plane_runtime"]))
+            op = plane_ops[plane_inds[-1]]
         run_time = time.time() - t0
         logger.info("total = %0.2f sec." % run_time)
 
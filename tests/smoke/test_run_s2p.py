@@ -1,3 +1,8 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+import tifffile
 import suite2p
 
 
@@ -32,3 +37,40 @@ def test_do_registration_do_roi_detect_settings_check_timing(test_ops):
     det_dec_ops = suite2p.run_s2p(ops=test_ops)  # detection & deconvolution
     assert list(det_dec_ops['timing'].keys()) == ['detection', 'extraction', 'classification',
                                                      'deconvolution', 'total_plane_runtime']
+
+
+def test_nplanes_parallel_matches_serial(tmp_path, synthetic_movie, caplog):
+    """
+    Tests that processing the planes in parallel worker processes gives the same outputs as processing them serially,
+    and that the log messages of the worker processes reach the loggers of the main process.
+    """
+    caplog.set_level(logging.INFO, logger='suite2p')
+    mov = np.stack([synthetic_movie(seed=iplane) for iplane in range(2)], axis=1)
+    data_path = tmp_path.joinpath('data')
+    data_path.mkdir()
+    tifffile.imwrite(data_path.joinpath('input.tif'), mov.reshape(-1, *mov.shape[2:]))
+    save_folders = []
+    for nplanes_parallel in [1, 2]:
+        ops = suite2p.default_ops()
+        ops.update({
+            'data_path': [str(data_path)],
+            'save_path0': str(tmp_path.joinpath(f'nplanes_parallel{nplanes_parallel}')),
+            'nplanes': 2,
+            'nplanes_parallel': nplanes_parallel,
+            'batch_size': 200,
+            'spatial_scale': 1,
+            'use_builtin_classifier': True,
+            'norm_frames': False,
+            'denoise': False,
+            'soma_crop': False,
+        })
+        caplog.clear()
+        suite2p.run_s2p(ops=ops)
+        worker_records = [r for r in caplog.records if r.processName != 'MainProcess']
+        assert bool(worker_records) == (nplanes_parallel > 1)
+        save_folders.append(Path(ops['save_path0']).joinpath('suite2p'))
+    for iplane in range(2):
+        for output in ['F.npy', 'spks.npy', 'iscell.npy']:
+            serial, parallel = [np.load(f.joinpath(f'plane{iplane}', output)) for f in save_folders]
+            assert len(serial) > 0
+            np.testing.assert_array_equal(parallel, serial)
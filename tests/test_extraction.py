@@ -0,0 +1,30 @@
+"""
+Tests for the Suite2p Extraction module
+"""
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter, maximum_filter1d, minimum_filter1d
+from suite2p.extraction import dcnv
+
+
+@pytest.mark.parametrize("n_frames, sig_baseline, win", [(3000, 10.0, 600), (200, 3.3, 8), (50, 10.0, 600), (500, 0.0, 7)])
+def test_maximin_preprocess_matches_scipy_filters(n_frames, sig_baseline, win):
+    np.random.seed(42)
+    F = (100 * np.random.randn(10, n_frames) + 500).astype(np.float32)
+    Flow = gaussian_filter(F, [0., sig_baseline])
+    Flow = minimum_filter1d(Flow, win)
+    Flow = maximum_filter1d(Flow, win)
+
+    dF = dcnv.preprocess(F, baseline="maximin", win_baseline=win, sig_baseline=sig_baseline, fs=1.0)
+    assert dF.dtype == np.float32
+    np.testing.assert_array_equal(dF, F - Flow)
+
+
+def test_oasis_cuda_matches_oasis():
+    pytest.importorskip("cupy")
+    from suite2p.extraction.oasis_cuda import oasis_cuda
+    np.random.seed(0)
+    F = (np.random.rand(300, 1000) ** 4 * 100 + 5 * np.random.randn(300, 1000)).astype(np.float32)
+    spks = dcnv.oasis(F, batch_size=128, tau=1.0, fs=10.)
+    spks_cuda = oasis_cuda(F, batch_size=128, tau=1.0, fs=10.)
+    np.testing.assert_allclose(spks_cuda, spks, rtol=1e-3, atol=1e-3)
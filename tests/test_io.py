@@ -13,6 +13,7 @@ from pynwb import NWBHDF5IO
 from suite2p import io
 from suite2p.io.nwb import read_nwb, save_nwb
 from suite2p.io.utils import get_suite2p_path
+from suite2p.run_s2p import pipeline
 
 
 @pytest.fixture()
@@ -127,6 +128,15 @@ def test_that_binaryfile_data_is_repeatable(binfile1500):
     assert np.allclose(data1, data2)
 
 
+def test_that_binaryfile_read_crop_matches_cropped_indexing(binfile1500):
+    inds = np.linspace(0, binfile1500.n_frames - 1, 20).astype(np.int64)
+    yslice, xslice = slice(5, binfile1500.Ly - 5), slice(3, binfile1500.Lx - 7)
+    crop = binfile1500.read_crop(inds, yslice, xslice)
+    assert crop.dtype == np.int16 and crop.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(crop, binfile1500[inds][:, yslice, xslice])
+    assert binfile1500.read_crop(inds, yslice, xslice, dtype=np.float32).dtype == np.float32
+
+
 @pytest.mark.parametrize(
     "data_folder",
     [
@@ -223,3 +233,36 @@ def test_get_suite2p_path(input_path, expected_path, success):
     else:
         with pytest.raises(FileNotFoundError):
             get_suite2p_path(Path(input_path))
+
+
+def _run_planes(save_path0, synthetic_movie, synthetic_ops, nplanes=2, **kwargs):
+    save_folder = Path(save_path0).joinpath("suite2p")
+    for iplane in range(nplanes):
+        mov = synthetic_movie(seed=iplane)
+        save_path = save_folder.joinpath(f"plane{iplane}")
+        save_path.mkdir(parents=True, exist_ok=True)
+        ops = synthetic_ops(mov, save_path, save_path0=str(save_path0), data_path=[str(save_path0)],
+                            batch_size=200, do_regmetrics=False, spatial_scale=1, **kwargs)
+        pipeline(mov, ops=ops)
+    return save_folder
+
+
+def test_save_npz_round_trip_through_load_outputs_and_combined(tmp_path, synthetic_movie, synthetic_ops):
+    save_folder = _run_planes(tmp_path, synthetic_movie, synthetic_ops, save_npz=True)
+    outputs = []
+    for iplane in range(2):
+        plane_folder = save_folder.joinpath(f"plane{iplane}")
+        assert plane_folder.joinpath("outputs.npz").exists()
+        assert not plane_folder.joinpath("F.npy").exists()
+        outputs.append(io.load_outputs(plane_folder))
+        assert len(outputs[-1]["stat"]) == len(outputs[-1]["F"]) == len(outputs[-1]["iscell"])
+
+    io.combined(save_folder, save=True)
+    F = np.load(save_folder.joinpath("combined", "F.npy"))
+    np.testing.assert_array_equal(F, np.concatenate([o["F"] for o in outputs]))
+
+    # a rerun saving .npy files removes the outputs.npz of the previous run
+    _run_planes(tmp_path, synthetic_movie, synthetic_ops, nplanes=1, save_npz=False)
+    plane_folder = save_folder.joinpath("plane0")
+    assert not plane_folder.joinpath("outputs.npz").exists()
+    np.testing.assert_array_equal(io.load_outputs(plane_folder)["F"], np.load(plane_folder.joinpath("F.npy")))
@@ -1,4 +1,7 @@
+import os
+
 import numpy as np
+from suite2p.run_s2p import pipeline, refimg_cache_file
 from suite2p.registration import bidiphase, utils
 
 
@@ -55,4 +58,35 @@ def test_negative_bidiphase_shift_shifts_every_other_line():
 
     shifted = orig.copy()
     bidiphase.shift(shifted, -2)
-    assert np.allclose(shifted, expected)
\ No newline at end of file
+    assert np.allclose(shifted, expected)
+
+
+# registration only, on a small synthetic movie
+REFIMG_CACHE_OPS = dict(refimg_cache=True, roidetect=False, do_regmetrics=False, nonrigid=False,
+                        batch_size=50, nimg_init=50)
+
+
+def test_refimg_cache_is_written_on_miss_and_used_on_hit(tmp_path, synthetic_movie, synthetic_ops):
+    mov = synthetic_movie(nframes=100, Ly=48, Lx=48)
+
+    # cache miss: the computed reference image is cached
+    ops = pipeline(mov.copy(), ops=synthetic_ops(mov, tmp_path, **REFIMG_CACHE_OPS))
+    cache_file = refimg_cache_file(ops, mov)
+    cached = np.load(cache_file, allow_pickle=True).item()
+    np.testing.assert_array_equal(cached["refImg"], ops["refImg"])
+
+    # cache hit: the cached reference image is used and the cache is not rewritten
+    refImg = np.roll(cached["refImg"], 1, axis=0)
+    np.save(cache_file, {"refImg": refImg, "bidiphase": cached["bidiphase"]})
+    ops = pipeline(mov.copy(), ops=synthetic_ops(mov, tmp_path, **REFIMG_CACHE_OPS))
+    np.testing.assert_array_equal(ops["refImg"], refImg)
+    np.testing.assert_array_equal(np.load(cache_file, allow_pickle=True).item()["refImg"], refImg)
+
+
+def test_refimg_cache_is_not_written_with_forced_refimg(tmp_path, synthetic_movie, synthetic_ops):
+    mov = synthetic_movie(nframes=100, Ly=48, Lx=48)
+    refImg = mov[:10].mean(axis=0).astype(np.int16)
+    ops = synthetic_ops(mov, tmp_path, force_refImg=True, refImg=refImg, **REFIMG_CACHE_OPS)
+    ops = pipeline(mov.copy(), ops=ops)
+    np.testing.assert_array_equal(ops["refImg"], refImg)
+    assert not os.path.exists(refimg_cache_file(ops, mov))